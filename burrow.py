@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # /// script
-# dependencies = ["fastapi", "uvicorn", "websockets"]
+# dependencies = ["fastapi", "uvicorn", "websockets", "orjson", "numpy", "uvloop", "httptools"]
 # ///
 """
 🐰 Burrow - Real-time Data Processing Demo for vmux
@@ -27,20 +27,21 @@ Then open your preview URL (e.g., https://abc123xyz.purr.ge) to see:
 """
 
 import asyncio
-import json
-import random
+import hashlib
 import time
 import os
 import signal
 import sys
-from collections import deque
+import zlib
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Set, Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+import numpy as np
+import orjson
 import uvicorn
 
 
@@ -48,37 +49,28 @@ import uvicorn
 # Data Models
 # ============================================================================
 
-@dataclass
 class CarrotStock:
-    """Rabbit commodities market ticker."""
-    symbol: str
-    name: str
-    price: float
-    emoji: str
-    change: float = 0.0
-    volume: int = 0
-
-    def hop(self) -> "CarrotStock":
-        """Simulate a price hop (rabbits don't just move, they hop!)."""
-        # Rabbits are unpredictable - sometimes big hops!
-        if random.random() < 0.1:  # 10% chance of big hop
-            movement = random.gauss(0, self.price * 0.01)  # 1% volatility
-        else:
-            movement = random.gauss(0, self.price * 0.002)  # 0.2% normal
-
-        self.change = movement
-        self.price = max(0.01, self.price + movement)
-        self.volume += random.randint(100, 1000)
-        return self
+    """Rabbit commodities market ticker (a record view; hops happen in hop_market)."""
+    __slots__ = ("symbol", "name", "price", "emoji", "change", "volume", "_static")
+
+    def __init__(self, symbol: str, name: str, price: float, emoji: str,
+                 change: float = 0.0, volume: int = 0):
+        self.symbol = symbol
+        self.name = name
+        self.price = price
+        self.emoji = emoji
+        self.change = change
+        self.volume = volume
+        # Fields that never hop, prebuilt so to_dict only adds the numbers
+        self._static = {"symbol": symbol, "name": name, "emoji": emoji}
 
     def to_dict(self) -> Dict[str, Any]:
+        price, change = self.price, self.change
         return {
-            "symbol": self.symbol,
-            "name": self.name,
-            "emoji": self.emoji,
-            "price": round(self.price, 2),
-            "change": round(self.change, 4),
-            "change_pct": round((self.change / (self.price - self.change)) * 100, 2) if self.price != self.change else 0,
+            **self._static,
+            "price": round(price, 2),
+            "change": round(change, 4),
+            "change_pct": round((change / (price - change)) * 100, 2) if price != change else 0,
             "volume": self.volume,
         }
 
@@ -92,20 +84,36 @@ class BurrowMetrics:
     hops_broadcast: int = 0     # messages sent
     carrots_processed: int = 0  # data points
 
+    # Every client polls /api/metrics, so snapshots are shared for a short TTL
+    SNAPSHOT_TTL = 0.5
+    MEMORY_TTL = 1.0
+    _snapshot: Tuple[float, Dict[str, Any], bytes] = field(default=(float("-inf"), {}, b""), init=False, repr=False)
+    _memory: Tuple[float, float] = field(default=(float("-inf"), 0.0), init=False, repr=False)
+
     @property
     def uptime_seconds(self) -> float:
         return time.time() - self.start_time
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "uptime_seconds": round(self.uptime_seconds, 2),
-            "uptime_human": self._format_uptime(),
-            "requests": self.requests,
-            "rabbits_connected": self.rabbits_connected,
-            "hops_broadcast": self.hops_broadcast,
-            "carrots_processed": self.carrots_processed,
-            "memory_mb": self._get_memory_mb(),
-        }
+        return self._fresh_snapshot()[1]
+
+    def to_json(self) -> bytes:
+        return self._fresh_snapshot()[2]
+
+    def _fresh_snapshot(self) -> Tuple[float, Dict[str, Any], bytes]:
+        now = time.monotonic()
+        if now - self._snapshot[0] >= self.SNAPSHOT_TTL:
+            data = {
+                "uptime_seconds": round(self.uptime_seconds, 2),
+                "uptime_human": self._format_uptime(),
+                "requests": self.requests,
+                "rabbits_connected": self.rabbits_connected,
+                "hops_broadcast": self.hops_broadcast,
+                "carrots_processed": self.carrots_processed,
+                "memory_mb": self._get_memory_mb(),
+            }
+            self._snapshot = (now, data, orjson.dumps(data))
+        return self._snapshot
 
     def _format_uptime(self) -> str:
         secs = int(self.uptime_seconds)
@@ -114,19 +122,34 @@ class BurrowMetrics:
         return f"{hours}h {minutes}m {seconds}s"
 
     def _get_memory_mb(self) -> float:
+        now = time.monotonic()
+        if now - self._memory[0] < self.MEMORY_TTL:
+            return self._memory[1]
         try:
             import resource
-            return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 / 1024, 2)
+            memory_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 / 1024, 2)
         except:
-            return 0.0
+            memory_mb = 0.0
+        self._memory = (now, memory_mb)
+        return memory_mb
 
 
 # ============================================================================
 # Global State (The Warren)
 # ============================================================================
 
-# WebSocket connection pool (rabbits in the warren)
-warren: Set[WebSocket] = set()
+# WebSocket connection pool (rabbits in the warren), each with its outbound queue
+WARREN_QUEUE_SIZE = 32
+WARREN_BATCH_MAX = 16
+HEARTBEAT_INTERVAL = 30.0
+warren: Dict[WebSocket, asyncio.Queue] = {}
+
+# Queued frames are (json, zlib-compressed json or None if not precompressed).
+# Rabbits that negotiate this subprotocol get the compressed bytes, so a tick
+# is compressed once for the whole warren instead of once per socket.
+DEFLATE_SUBPROTOCOL = "burrow-deflate-v1"
+Frame = Tuple[bytes, Optional[bytes]]
+deflate_rabbits = 0  # connected rabbits that negotiated DEFLATE_SUBPROTOCOL
 
 # Rabbit commodities market
 MARKET = {
@@ -137,68 +160,155 @@ MARKET = {
     "THYM": CarrotStock("THYM", "Garden Thyme", 195.40, "🌿"),
 }
 
+# Market state as parallel arrays so every stock hops in one vectorized step
+PRICES = np.array([s.price for s in MARKET.values()])
+CHANGES = np.zeros(len(MARKET))
+VOLUMES = np.zeros(len(MARKET), dtype=np.int64)
+
 # Metrics
 metrics = BurrowMetrics()
 
-# Recent data buffer (rabbit memory - they remember the last 100 hops)
-hop_history: deque = deque(maxlen=100)
+# Recent data buffer (rabbit memory - they remember the last 100 hops),
+# preallocated ring arrays holding one row of prices per hop
+HIST_LEN = 100
+hist_prices = np.zeros((HIST_LEN, len(MARKET)))
+hist_ts = np.zeros(HIST_LEN)
+hist_head = 0
+hist_count = 0
+
+# Timestamp of the latest tick, formatted once and shared by every reader
+LAST_TICK_TS: str = datetime.now().isoformat()
+
+# Encoded /api/market payload from the latest tick: (monotonic time, bytes)
+TICK_CACHE_TTL = 0.5
+_last_tick_cache: Tuple[float, bytes] = (0.0, b"")
 
-# Shutdown event
-burrow_closing = asyncio.Event()
+# Constant-shape envelopes; only the data and timestamp are formatted per tick
+MARKET_ENVELOPE = b'{"stocks":%b,"timestamp":"%b"}'
+MARKET_HOP_ENVELOPE = b'{"type":"market_hop","data":%b,"timestamp":"%b"}'
 
 
 # ============================================================================
 # Background Tasks (Night Watch Rabbits)
 # ============================================================================
 
-async def market_hopper():
-    """Simulate the rabbit commodities market and broadcast to warren."""
-    while not burrow_closing.is_set():
-        # All stocks take a hop
-        updates = []
-        for stock in MARKET.values():
-            stock.hop()
-            updates.append(stock.to_dict())
-            metrics.carrots_processed += 1
-
-        # Store in history
-        hop_history.append({
-            "timestamp": datetime.now().isoformat(),
-            "stocks": updates,
-        })
+def hop_market(rng: np.random.Generator):
+    """All stocks take a hop (rabbits don't just move, they hop!)."""
+    global PRICES, CHANGES, VOLUMES
+    n = len(PRICES)
 
-        # Broadcast to all rabbits in the warren
-        if warren:
-            message = json.dumps({
-                "type": "market_hop",
-                "data": updates,
-                "timestamp": datetime.now().isoformat(),
-            })
+    # Rabbits are unpredictable - 10% chance of a big hop (1% volatility),
+    # otherwise 0.2% normal
+    sigma = np.where(rng.random(n) < 0.1, PRICES * 0.01, PRICES * 0.002)
+    CHANGES = rng.normal(0.0, sigma)
+    PRICES = np.maximum(0.01, PRICES + CHANGES)
+    VOLUMES += rng.integers(100, 1001, size=n)
 
-            disconnected = set()
-            for rabbit in warren:
-                try:
-                    await rabbit.send_text(message)
-                    metrics.hops_broadcast += 1
-                except:
-                    disconnected.add(rabbit)
+    for stock, price, change, volume in zip(
+        MARKET.values(), PRICES.tolist(), CHANGES.tolist(), VOLUMES.tolist()
+    ):
+        stock.price, stock.change, stock.volume = price, change, volume
 
-            warren.difference_update(disconnected)
 
-        await asyncio.sleep(0.5)  # 2 hops per second
+async def market_hopper():
+    """Simulate the rabbit commodities market and broadcast to warren."""
+    global _last_tick_cache, LAST_TICK_TS, hist_head, hist_count
+    rng = np.random.default_rng()
+    try:
+        while True:
+            # All stocks take a hop
+            hop_market(rng)
+            updates = [stock.to_dict() for stock in MARKET.values()]
+            metrics.carrots_processed += len(updates)
+            ts = LAST_TICK_TS = datetime.now().isoformat()
+
+            # Store in history
+            hist_prices[hist_head] = PRICES
+            hist_ts[hist_head] = time.time()
+            hist_head = (hist_head + 1) % HIST_LEN
+            hist_count = min(hist_count + 1, HIST_LEN)
+
+            # Encode once for every /api/market and SSE reader this tick
+            data_bytes, ts_bytes = orjson.dumps(updates), ts.encode()
+            _last_tick_cache = (time.monotonic(), MARKET_ENVELOPE % (data_bytes, ts_bytes))
+
+            # Broadcast to all rabbits in the warren, from one snapshot per tick
+            queues = tuple(warren.values())
+            metrics.rabbits_connected = len(queues)
+            if queues:
+                message = MARKET_HOP_ENVELOPE % (data_bytes, ts_bytes)
+
+                packed = zlib.compress(message, 1) if deflate_rabbits else None
+                frame: Frame = (message, packed)
+
+                # Never await a socket here: one slow rabbit must not stall the rest
+                for queue in queues:
+                    try:
+                        queue.put_nowait(frame)
+                    except asyncio.QueueFull:
+                        # Backpressured rabbit: drop its stalest hop to make room
+                        queue.get_nowait()
+                        queue.put_nowait(frame)
+                metrics.hops_broadcast += len(queues)
+
+            await asyncio.sleep(0.5)  # 2 hops per second
+    except asyncio.CancelledError:
+        return
 
 
 async def warren_watcher():
     """Periodically log warren status to console."""
     rabbit_states = ["🐰", "🐇", "🐾"]
     idx = 0
-    while not burrow_closing.is_set():
-        m = metrics.to_dict()
-        state = rabbit_states[idx % len(rabbit_states)]
-        print(f"{state} Warren | uptime={m['uptime_human']} rabbits={m['rabbits_connected']} "
-              f"hops={m['hops_broadcast']} carrots={m['carrots_processed']}")
-        idx += 1
-        await asyncio.sleep(10)
+    try:
+        while True:
+            m = metrics.to_dict()
+            state = rabbit_states[idx % len(rabbit_states)]
+            print(f"{state} Warren | uptime={m['uptime_human']} rabbits={m['rabbits_connected']} "
+                  f"hops={m['hops_broadcast']} carrots={m['carrots_processed']}")
+            idx += 1
+            await asyncio.sleep(10)
+    except asyncio.CancelledError:
+        return
+
+
+def market_snapshot() -> bytes:
+    """Encoded market payload, reused from the last tick while it is fresh."""
+    stamped, payload = _last_tick_cache
+    if time.monotonic() - stamped < TICK_CACHE_TTL:
+        return payload
+    return MARKET_ENVELOPE % (
+        orjson.dumps([s.to_dict() for s in MARKET.values()]),
+        LAST_TICK_TS.encode(),
+    )
+
+
+async def relay(websocket: WebSocket, queue: asyncio.Queue, deflate: bool):
+    """Drain one rabbit's outbound queue onto its socket.
+
+    Frames that piled up while the rabbit was slow are merged into a single
+    {"type": "batch", "frames": [...]} message, one send for the lot.
+    """
+    while True:
+        message, packed = await queue.get()
+        if not queue.empty():
+            batch = [message]
+            while not queue.empty() and len(batch) < WARREN_BATCH_MAX:
+                batch.append(queue.get_nowait()[0])
+            message = b'{"type":"batch","frames":[' + b",".join(batch) + b"]}"
+            packed = None
+
+        if deflate:
+            await websocket.send_bytes(packed or zlib.compress(message, 1))
+        else:
+            await websocket.send_bytes(message)
+
+
+async def heartbeat(queue: asyncio.Queue):
+    """Push warren metrics to one rabbit on a fixed cadence."""
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        await queue.put((b'{"type":"metrics","data":' + metrics.to_json() + b"}", None))
 
 
 # ============================================================================
@@ -222,7 +332,6 @@ async def lifespan(app: FastAPI):
 
     # Time to close the burrow
     print("\n🌙 Burrow closing for the night...")
-    burrow_closing.set()
 
     for task in tasks:
         task.cancel()
@@ -231,12 +340,8 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             pass
 
-    # Send all rabbits home
-    for rabbit in list(warren):
-        try:
-            await rabbit.close()
-        except:
-            pass
+    # Send all rabbits home at once; a stuck socket shouldn't hold up the rest
+    await asyncio.gather(*(rabbit.close() for rabbit in list(warren)), return_exceptions=True)
 
     print("💤 All rabbits tucked in. Goodnight!")
 
@@ -266,6 +371,7 @@ BURROW_HTML = """
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=JetBrains+Mono:wght@400;500;600&display=swap" rel="stylesheet">
+    <script src="https://cdn.jsdelivr.net/npm/pako@2.1.0/dist/pako_inflate.min.js"></script>
     <style>
         :root {
             --bg: #0f1115;
@@ -626,10 +732,14 @@ BURROW_HTML = """
         const statusDot = document.querySelector('.status-dot');
 
         const fmt = (n) => n.toLocaleString();
+        const decoder = new TextDecoder();
 
         function connect() {
             const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
-            const ws = new WebSocket(`${protocol}//${location.host}/ws`);
+            // Ask for precompressed frames only if pako loaded
+            const protocols = window.pako ? ['burrow-deflate-v1'] : [];
+            const ws = new WebSocket(`${protocol}//${location.host}/ws`, protocols);
+            ws.binaryType = 'arraybuffer';
 
             ws.onopen = () => {
                 statusEl.textContent = 'connected';
@@ -639,14 +749,11 @@ BURROW_HTML = """
             };
 
             ws.onmessage = (event) => {
-                const msg = JSON.parse(event.data);
-
-                if (msg.type === 'market_hop') {
-                    updateStocks(msg.data);
-                    lastUpdateEl.textContent = new Date(msg.timestamp).toLocaleTimeString();
-                } else if (msg.type === 'metrics') {
-                    updateMetrics(msg.data);
-                }
+                // Server sends orjson-encoded binary frames, zlib'd if negotiated
+                const bytes = ws.protocol === 'burrow-deflate-v1'
+                    ? pako.inflate(new Uint8Array(event.data))
+                    : event.data;
+                handleMessage(JSON.parse(decoder.decode(bytes)));
             };
 
             ws.onclose = () => {
@@ -662,6 +769,17 @@ BURROW_HTML = """
             ws.onerror = () => addLog('⚠️ tunnel collapse');
         }
 
+        function handleMessage(msg) {
+            if (msg.type === 'market_hop') {
+                updateStocks(msg.data);
+                lastUpdateEl.textContent = new Date(msg.timestamp).toLocaleTimeString();
+            } else if (msg.type === 'metrics') {
+                updateMetrics(msg.data);
+            } else if (msg.type === 'batch') {
+                msg.frames.forEach(handleMessage);
+            }
+        }
+
         function updateStocks(stocks) {
             stocksEl.innerHTML = stocks.map(s => `
                 <div class="stock-row">
@@ -740,44 +858,90 @@ BURROW_HTML = """
 </html>
 """
 
+# Encoded once at import; every request just hands these bytes to the socket
+BURROW_HTML_BYTES = BURROW_HTML.encode("utf-8")
+BURROW_HTML_LEN = str(len(BURROW_HTML_BYTES))
+BURROW_HTML_ETAG = f'"{hashlib.md5(BURROW_HTML_BYTES, usedforsecurity=False).hexdigest()}"'
+BURROW_HTML_CACHE_CONTROL = "public, max-age=60"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak If-None-Match comparison (RFC 9110): any listed tag or `*`.
+
+    Proxies such as Cloudflare weaken ETags to W/"..." when they compress,
+    so the W/ prefix is ignored on both sides.
+    """
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+# Liveness probes hit /api/health constantly; only two fields change per call
+HEALTH_TMPL = '{"status":"🐰 hopping","timestamp":"%b","uptime_seconds":%b}'.encode()
+
 
 # ============================================================================
 # Routes
 # ============================================================================
 
 @app.get("/", response_class=HTMLResponse)
-async def index():
+async def index(request: Request):
     """Serve the burrow dashboard."""
     metrics.requests += 1
-    return BURROW_HTML
+    # Reloads and probes that already hold this page get an empty 304
+    if etag_matches(request.headers.get("if-none-match"), BURROW_HTML_ETAG):
+        return Response(status_code=304, headers={
+            "Cache-Control": BURROW_HTML_CACHE_CONTROL,
+            "ETag": BURROW_HTML_ETAG,
+        })
+    return Response(
+        content=BURROW_HTML_BYTES,
+        media_type="text/html; charset=utf-8",
+        headers={
+            "Content-Length": BURROW_HTML_LEN,
+            "Cache-Control": BURROW_HTML_CACHE_CONTROL,
+            "ETag": BURROW_HTML_ETAG,
+        },
+    )
 
 
 @app.get("/api/health")
 async def health():
     """Health check for monitoring."""
     metrics.requests += 1
-    return {
-        "status": "🐰 hopping",
-        "timestamp": datetime.now().isoformat(),
-        "uptime_seconds": metrics.uptime_seconds,
-    }
+    ts = datetime.now().isoformat().encode()
+    uptime = f"{metrics.uptime_seconds:.2f}".encode()
+    return Response(content=HEALTH_TMPL % (ts, uptime), media_type="application/json")
 
 
 @app.get("/api/metrics")
 async def get_metrics():
     """Warren metrics endpoint."""
     metrics.requests += 1
-    return metrics.to_dict()
+    return Response(content=metrics.to_json(), media_type="application/json")
 
 
 @app.get("/api/market")
 async def get_market():
     """Current market data."""
     metrics.requests += 1
-    return {
-        "stocks": [s.to_dict() for s in MARKET.values()],
-        "timestamp": datetime.now().isoformat(),
-    }
+    return Response(content=market_snapshot(), media_type="application/json")
+
+
+@app.get("/api/history")
+async def get_history():
+    """Recent price history per stock, oldest hop first."""
+    metrics.requests += 1
+    order = (np.arange(hist_count) + hist_head - hist_count) % HIST_LEN
+    return Response(content=orjson.dumps({
+        "timestamps": hist_ts[order].tolist(),
+        "prices": dict(zip(MARKET, np.round(hist_prices[order], 2).T.tolist())),
+    }), media_type="application/json")
 
 
 @app.get("/api/stream")
@@ -790,13 +954,10 @@ async def stream_events(request: Request):
             if await request.is_disconnected():
                 break
 
-            data = {
-                "stocks": [s.to_dict() for s in MARKET.values()],
-                "metrics": metrics.to_dict(),
-                "timestamp": datetime.now().isoformat(),
-            }
-
-            yield f"data: {json.dumps(data)}\n\n"
+            # Splice metrics into the cached market object: {"metrics":...,"stocks":...}
+            market = market_snapshot()
+            yield (b'data: {"metrics":' + metrics.to_json()
+                   + b"," + market[1:] + b"\n\n")
             await asyncio.sleep(1)
 
     return StreamingResponse(
@@ -812,42 +973,32 @@ async def stream_events(request: Request):
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time warren updates."""
-    await websocket.accept()
-    warren.add(websocket)
-    metrics.rabbits_connected = len(warren)
-
-    print(f"🐰 New rabbit joined the warren (total: {len(warren)})")
+    global deflate_rabbits
+    deflate = DEFLATE_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    await websocket.accept(subprotocol=DEFLATE_SUBPROTOCOL if deflate else None)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=WARREN_QUEUE_SIZE)
+    relay_task = asyncio.create_task(relay(websocket, queue, deflate))
+    heartbeat_task = asyncio.create_task(heartbeat(queue))
+    warren[websocket] = queue
+    deflate_rabbits += deflate
 
     try:
-        # Send welcome metrics
-        await websocket.send_text(json.dumps({
-            "type": "metrics",
-            "data": metrics.to_dict(),
-        }))
+        # Send welcome metrics (all writes go through the relay)
+        queue.put_nowait((b'{"type":"metrics","data":' + metrics.to_json() + b"}", None))
 
-        while True:
-            try:
-                data = await asyncio.wait_for(
-                    websocket.receive_text(),
-                    timeout=30.0
-                )
-                msg = json.loads(data)
-                if msg.get("type") == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong"}))
-
-            except asyncio.TimeoutError:
-                # Send heartbeat
-                await websocket.send_text(json.dumps({
-                    "type": "metrics",
-                    "data": metrics.to_dict(),
-                }))
+        async for data in websocket.iter_text():
+            msg = orjson.loads(data)
+            if msg.get("type") == "ping":
+                await queue.put((orjson.dumps({"type": "pong"}), None))
 
     except WebSocketDisconnect:
         pass
     finally:
-        warren.discard(websocket)
-        metrics.rabbits_connected = len(warren)
-        print(f"🐾 Rabbit left the warren (total: {len(warren)})")
+        warren.pop(websocket, None)
+        deflate_rabbits -= deflate
+        relay_task.cancel()
+        heartbeat_task.cancel()
+        await asyncio.gather(relay_task, heartbeat_task, return_exceptions=True)
 
 
 # ============================================================================
@@ -857,7 +1008,6 @@ async def websocket_endpoint(websocket: WebSocket):
 def handle_signal(signum, frame):
     """Handle shutdown signals gracefully."""
     print(f"\n🌙 Received signal {signum}, closing burrow...")
-    burrow_closing.set()
     sys.exit(0)
 
 
@@ -883,6 +1033,7 @@ if __name__ == "__main__":
     ║   🌐 HTTP:  http://0.0.0.0:{port:<4}                          ║
     ║   📡 WS:    ws://0.0.0.0:{port:<4}/ws                         ║
     ║   📊 API:   /api/health, /api/metrics, /api/market           ║
+    ║             /api/history                                     ║
     ║   📺 SSE:   /api/stream                                      ║
     ║                                                               ║
     ║   Run with: vmux run --preview python burrow.py              ║
@@ -896,6 +1047,9 @@ if __name__ == "__main__":
         app,
         host="0.0.0.0",
         port=port,
-        log_level="info",
-        access_log=True,
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+        access_log=False,  # every client polls /api/metrics; warren_watcher logs counts
+        ws_per_message_deflate=False,  # frames are precompressed once per tick
     )
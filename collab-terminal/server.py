@@ -7,26 +7,45 @@ Multiple users can connect and see/send commands to the same PTY.
 """
 
 import asyncio
+import errno
 import os
 import pty
-import select
+import signal
+import socket
 import struct
 import fcntl
 import termios
-from typing import Dict, Set
+from typing import Dict, List
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
+import msgpack
+import orjson
 import uvicorn
 
 app = FastAPI(title="vmux Terminal")
 
-# Connected clients per room
-rooms: Dict[str, Set[WebSocket]] = {}
+# Connected clients per room (unordered; removal swaps with the last entry)
+rooms: Dict[str, List[WebSocket]] = {}
 
 # PTY processes per room
 pty_processes: Dict[str, dict] = {}
 
+# Server -> client frames are MessagePack, so PTY bytes go out as raw bin
+# instead of escaped JSON strings
+packer = msgpack.Packer(use_bin_type=True)
+
+# PTY output is buffered briefly so bursts go out as one frame
+OUTPUT_FLUSH_DELAY = 0.005
+OUTPUT_FLUSH_BYTES = 65536
+
+# A client that can't take a frame within this long is treated as gone
+SEND_TIMEOUT = 2.0
+
+# Hung-up shells are polled until reaped, and killed if they won't exit
+REAP_INTERVAL = 0.5
+REAP_ATTEMPTS = 10
+
 
 HTML_PAGE = """
 <!DOCTYPE html>
@@ -37,6 +56,7 @@ HTML_PAGE = """
     <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/xterm@5.3.0/css/xterm.css">
     <script src="https://cdn.jsdelivr.net/npm/xterm@5.3.0/lib/xterm.js"></script>
     <script src="https://cdn.jsdelivr.net/npm/xterm-addon-fit@0.8.0/lib/xterm-addon-fit.js"></script>
+    <script src="https://cdn.jsdelivr.net/npm/@msgpack/msgpack@2.8.0/dist.es5+umd/msgpack.min.js"></script>
     <style>
         * { margin: 0; padding: 0; box-sizing: border-box; }
         body {
@@ -110,6 +130,7 @@ HTML_PAGE = """
         // WebSocket connection
         const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
         const ws = new WebSocket(`${protocol}//${location.host}/ws/main`);
+        ws.binaryType = 'arraybuffer';
 
         ws.onopen = () => {
             term.write('\\r\\n\\x1b[32mConnected to collaborative terminal!\\x1b[0m\\r\\n');
@@ -122,8 +143,9 @@ HTML_PAGE = """
         };
 
         ws.onmessage = (event) => {
-            const msg = JSON.parse(event.data);
+            const msg = MessagePack.decode(new Uint8Array(event.data));
             if (msg.type === 'output') {
+                // Raw PTY bytes; xterm.js does its own UTF-8 decoding
                 term.write(msg.data);
             } else if (msg.type === 'users') {
                 document.getElementById('user-count').textContent =
@@ -165,9 +187,7 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
     await websocket.accept()
 
     # Add to room
-    if room_id not in rooms:
-        rooms[room_id] = set()
-    rooms[room_id].add(websocket)
+    rooms.setdefault(room_id, []).append(websocket)
 
     # Start PTY if not exists for this room
     if room_id not in pty_processes:
@@ -186,24 +206,36 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
         else:
             # Parent process
             os.close(slave_fd)
+            # The loop's reader/writer callbacks must never block on the PTY
+            os.set_blocking(master_fd, False)
             pty_processes[room_id] = {
                 'master_fd': master_fd,
-                'pid': pid
+                'pid': pid,
+                'pending': bytearray(),
+                'flush': None,
+                'input': bytearray(),
+                'input_scheduled': False,
             }
-            # Start reading from PTY in background
-            asyncio.create_task(read_pty(room_id, master_fd))
+            # Let the event loop tell us when the PTY has output
+            loop = asyncio.get_running_loop()
+            loop.add_reader(master_fd, pty_readable, room_id, master_fd)
 
     # Broadcast user count
     await broadcast_users(room_id)
 
+    loads = orjson.loads
+    receive_text = websocket.receive_text
     try:
         while True:
-            data = await websocket.receive_text()
-            msg = __import__('json').loads(data)
+            msg = loads(await receive_text())
 
             if msg['type'] == 'input' and room_id in pty_processes:
-                # Write to PTY
-                os.write(pty_processes[room_id]['master_fd'], msg['data'].encode())
+                # Queue for the PTY; everyone's keystrokes this tick share one write
+                proc = pty_processes[room_id]
+                proc['input'] += msg['data'].encode()
+                if not proc['input_scheduled']:
+                    proc['input_scheduled'] = True
+                    asyncio.get_running_loop().call_soon(flush_input, room_id)
 
             elif msg['type'] == 'resize' and room_id in pty_processes:
                 # Resize PTY
@@ -213,57 +245,164 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
     except WebSocketDisconnect:
         pass
     finally:
-        rooms[room_id].discard(websocket)
+        leave_room(room_id, websocket)
         await broadcast_users(room_id)
 
-        # Clean up if no users left
-        if not rooms[room_id]:
+        # Clean up if no users left (another client's teardown may have done it)
+        if room_id in rooms and not rooms[room_id]:
             del rooms[room_id]
-            if room_id in pty_processes:
-                try:
-                    os.kill(pty_processes[room_id]['pid'], 9)
-                    os.close(pty_processes[room_id]['master_fd'])
-                except:
-                    pass
-                del pty_processes[room_id]
+            close_pty(room_id)
+
+
+def leave_room(room_id: str, ws: WebSocket):
+    """Swap-remove a client from its room, if it's still there"""
+    clients = rooms.get(room_id)
+    if clients is None:
+        return
+    try:
+        i = clients.index(ws)
+    except ValueError:
+        return
+    clients[i] = clients[-1]
+    clients.pop()
+
+
+def close_pty(room_id: str, exited: bool = False):
+    """Hang up a room's shell and release its PTY
+
+    exited means the PTY already reported EOF, so no SIGHUP is sent. EOF only
+    says nothing holds the terminal open any more; the shell may still be
+    running, so it is reaped without blocking either way.
+    """
+    proc = pty_processes.pop(room_id, None)
+    if proc is None:
+        return
 
+    if proc['flush'] is not None:
+        proc['flush'].cancel()
+    loop = asyncio.get_running_loop()
+    loop.remove_reader(proc['master_fd'])
+    loop.remove_writer(proc['master_fd'])
 
-async def read_pty(room_id: str, master_fd: int):
-    """Read from PTY and broadcast to all clients"""
-    loop = asyncio.get_event_loop()
+    os.close(proc['master_fd'])
 
-    while room_id in pty_processes:
+    # SIGHUP lets bash clean up; reap it once it has exited
+    if not exited:
         try:
-            # Check if there's data to read
-            r, _, _ = select.select([master_fd], [], [], 0.1)
-            if r:
-                data = os.read(master_fd, 4096)
-                if data:
-                    await broadcast_output(room_id, data.decode('utf-8', errors='replace'))
-                else:
-                    break
-        except Exception as e:
+            os.kill(proc['pid'], signal.SIGHUP)
+        except ProcessLookupError:
+            pass
+    reap_child(proc['pid'])
+
+
+def reap_child(pid: int, attempts: int = 0):
+    """Collect a hung-up shell without blocking, retrying until it exits"""
+    try:
+        done, _ = os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        return
+    if done:
+        return
+
+    if attempts >= REAP_ATTEMPTS:
+        os.kill(pid, signal.SIGKILL)
+    asyncio.get_running_loop().call_later(REAP_INTERVAL, reap_child, pid, attempts + 1)
+
+
+async def end_room(room_id: str, last_output: bytes):
+    """Send a dead shell's final output, then disconnect its room"""
+    if last_output:
+        await broadcast_output(room_id, last_output)
+    for ws in list(rooms.get(room_id, ())):
+        try:
+            await ws.close()
+        except:
+            pass
+
+
+def pty_readable(room_id: str, master_fd: int):
+    """Buffer ready PTY output; a short timer flushes it to all clients"""
+    proc = pty_processes[room_id]
+    try:
+        data = os.read(master_fd, 65536)
+    except BlockingIOError:
+        return
+    except OSError as e:
+        # EIO is how Linux reports that the shell side has closed
+        if e.errno != errno.EIO:
             print(f"PTY read error: {e}")
-            break
+        data = b''
+
+    if not data:
+        # The shell exited: tear the room down instead of leaving a dead terminal
+        last_output = bytes(proc['pending'])
+        close_pty(room_id, exited=True)
+        asyncio.create_task(end_room(room_id, last_output))
+        return
+
+    proc['pending'] += data
+    if len(proc['pending']) >= OUTPUT_FLUSH_BYTES:
+        flush_output(room_id)
+    elif proc['flush'] is None:
+        proc['flush'] = asyncio.get_running_loop().call_later(
+            OUTPUT_FLUSH_DELAY, flush_output, room_id)
+
+
+def flush_output(room_id: str):
+    """Broadcast everything buffered for a room as a single frame"""
+    proc = pty_processes.get(room_id)
+    if proc is None:
+        return
+
+    if proc['flush'] is not None:
+        proc['flush'].cancel()
+        proc['flush'] = None
+
+    if proc['pending']:
+        data = bytes(proc['pending'])
+        proc['pending'].clear()
+        asyncio.create_task(broadcast_output(room_id, data))
+
+
+def flush_input(room_id: str):
+    """Write all input queued for a room to its PTY in one syscall"""
+    proc = pty_processes.get(room_id)
+    if proc is None:
+        return
+
+    proc['input_scheduled'] = False
+    buf = proc['input']
+    try:
+        written = os.write(proc['master_fd'], buf)
+    except BlockingIOError:
+        written = 0
+    except OSError:
+        # Shell is gone (EIO): drop the input, pty_readable's EOF path ends the room
+        buf.clear()
+        asyncio.get_running_loop().remove_writer(proc['master_fd'])
+        return
+    del buf[:written]
 
-        await asyncio.sleep(0.01)
+    # Short write: keep the tail and resume once the PTY is writable again
+    loop = asyncio.get_running_loop()
+    if buf:
+        proc['input_scheduled'] = True
+        loop.add_writer(proc['master_fd'], flush_input, room_id)
+    else:
+        loop.remove_writer(proc['master_fd'])
 
 
-async def broadcast_output(room_id: str, data: str):
+async def broadcast_output(room_id: str, data: bytes):
     """Broadcast PTY output to all clients in room"""
     if room_id not in rooms:
         return
 
-    message = __import__('json').dumps({'type': 'output', 'data': data})
-    disconnected = set()
+    # Encoded once; every client gets the same bytes
+    frame = packer.pack({'type': 'output', 'data': data})
+    clients = list(rooms[room_id])
+    results = await send_all(clients, frame)
 
-    for ws in rooms[room_id]:
-        try:
-            await ws.send_text(message)
-        except:
-            disconnected.add(ws)
-
-    rooms[room_id] -= disconnected
+    await drop_failed(room_id, clients, results)
 
 
 async def broadcast_users(room_id: str):
@@ -272,13 +411,34 @@ async def broadcast_users(room_id: str):
         return
 
     count = len(rooms[room_id])
-    message = __import__('json').dumps({'type': 'users', 'count': count})
+    frame = packer.pack({'type': 'users', 'count': count})
+    clients = list(rooms[room_id])
+    await drop_failed(room_id, clients, await send_all(clients, frame))
 
-    for ws in rooms[room_id]:
-        try:
-            await ws.send_text(message)
-        except:
-            pass
+
+async def send_all(clients: list, frame: bytes) -> list:
+    """Send a frame to every client concurrently; returns per-client results"""
+    return await asyncio.gather(
+        *(asyncio.wait_for(ws.send_bytes(frame), SEND_TIMEOUT) for ws in clients),
+        return_exceptions=True,
+    )
+
+
+async def drop_failed(room_id: str, clients: list, results: list):
+    """Remove clients whose send failed or timed out
+
+    A failed send means the peer is already gone. A timed-out one is still
+    connected, so it is closed; that ends its websocket_endpoint, which
+    stops its input and re-broadcasts the user count.
+    """
+    stalled = []
+    for ws, r in zip(clients, results):
+        if isinstance(r, Exception):
+            leave_room(room_id, ws)
+            if isinstance(r, asyncio.TimeoutError):
+                stalled.append(asyncio.wait_for(ws.close(code=1011), SEND_TIMEOUT))
+    if stalled:
+        await asyncio.gather(*stalled, return_exceptions=True)
 
 
 if __name__ == "__main__":
@@ -286,4 +446,12 @@ if __name__ == "__main__":
     print(f"Starting Collaborative Terminal on port {port}...")
     print("Share this terminal with others using your preview URL!")
     print(f"[vmux:ready] http://0.0.0.0:{port}")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+
+    # Terminal echo is small-frame and latency-bound: no Nagle, and room for
+    # bursty output. Accepted connections inherit these from the listener.
+    sock = socket.create_server(("0.0.0.0", port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+
+    config = uvicorn.Config(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools")
+    uvicorn.Server(config).run(sockets=[sock])
@@ -6,12 +6,13 @@ import time
 DURATION_SECONDS = 2 * 60 * 60  # 2 hours
 
 def main():
-    start = time.time()
-    end = start + DURATION_SECONDS
+    # Sleep to absolute deadlines so print time doesn't accumulate as drift
+    next_tick = time.monotonic()
 
-    while time.time() < end:
+    for _ in range(DURATION_SECONDS):
         print(int(time.time()))
-        time.sleep(1)
+        next_tick += 1.0
+        time.sleep(max(0, next_tick - time.monotonic()))
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,8 @@
 import time
 import random
 
+ORNAMENTS = ["🔴", "🔵", "🟡", "⚪"]
+
 def main():
     # Build the tree
     tree_height = 12
@@ -16,12 +18,10 @@ def main():
         width = 2 * i + 1
 
         # Add some ornaments randomly
-        row = ""
-        for j in range(width):
-            if random.random() < 0.15:
-                row += random.choice(["🔴", "🔵", "🟡", "⚪"])
-            else:
-                row += "🌲"
+        row = "".join(
+            random.choice(ORNAMENTS) if random.random() < 0.15 else "🌲"
+            for _ in range(width)
+        )
 
         print(spaces + row)
         time.sleep(0.2)
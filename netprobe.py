@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # /// script
-# dependencies = ["aiohttp"]
+# requires-python = ">=3.11"
+# dependencies = ["aiohttp", "uvloop"]
 # ///
 """
 NetProbe - Network Analytics Tool
@@ -17,11 +18,13 @@ Features:
 
 import asyncio
 import aiohttp
+import uvloop
 import time
 import statistics
 import socket
 import struct
 import random
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import Optional
@@ -36,11 +39,11 @@ class ConnectionQuality(Enum):
     CRITICAL = "critical"
 
 
-@dataclass
+@dataclass(slots=True)
 class ProbeResult:
     """Result from a single probe."""
     endpoint: str
-    timestamp: datetime
+    timestamp: int  # ns since epoch; format with datetime.fromtimestamp(ts / 1e9)
     latency_ms: float
     success: bool
     error: Optional[str] = None
@@ -59,20 +62,25 @@ class EndpointStats:
     download_mbps: Optional[float] = None
     upload_mbps: Optional[float] = None
     quality: ConnectionQuality = ConnectionQuality.POOR
-    latencies: list = field(default_factory=list)
+    n: int = 0      # successful samples
+    # Jitter tracks a rolling window, so it follows current network conditions
+    recent: deque = field(default_factory=lambda: deque(maxlen=1024))
 
     def update(self, result: ProbeResult):
         """Update stats with new probe result."""
         if result.success:
-            self.latencies.append(result.latency_ms)
-            self.min_latency_ms = min(self.min_latency_ms, result.latency_ms)
-            self.max_latency_ms = max(self.max_latency_ms, result.latency_ms)
-            self.avg_latency_ms = statistics.mean(self.latencies)
-            if len(self.latencies) > 1:
-                self.jitter_ms = statistics.stdev(self.latencies)
+            x = result.latency_ms
+            self.min_latency_ms = min(self.min_latency_ms, x)
+            self.max_latency_ms = max(self.max_latency_ms, x)
+            # Welford's online mean: O(1) per probe, no full sample list
+            self.n += 1
+            self.avg_latency_ms += (x - self.avg_latency_ms) / self.n
+            self.recent.append(x)
+            if len(self.recent) > 1:
+                self.jitter_ms = statistics.stdev(self.recent)
 
         self.samples += 1
-        failed = self.samples - len(self.latencies)
+        failed = self.samples - self.n
         self.packet_loss_pct = (failed / self.samples) * 100
         self._calculate_quality()
 
@@ -107,6 +115,40 @@ SPEED_TEST_ENDPOINTS = {
     "cloudflare-1mb": "https://speed.cloudflare.com/__down?bytes=1048576",
 }
 
+# Stats table layout, built once
+QUALITY_INDICATORS = {
+    ConnectionQuality.EXCELLENT: "●",  # Green
+    ConnectionQuality.GOOD: "●",       # Light green
+    ConnectionQuality.FAIR: "●",       # Yellow
+    ConnectionQuality.POOR: "●",       # Orange
+    ConnectionQuality.CRITICAL: "●",   # Red
+}
+TABLE_RULE = "=" * 90
+TABLE_HEADER = (f"{'Endpoint':<15} {'RTT (ms)':<12} {'Min/Max':<15} "
+                f"{'Jitter':<10} {'Loss %':<8} {'Quality':<12}")
+TABLE_DIVIDER = "-" * 90
+
+# Speed tests stream in fixed-size chunks instead of buffering whole payloads
+CHUNK_SIZE = 1 << 16
+UPLOAD_CHUNK = bytes(CHUNK_SIZE)
+
+
+async def zero_stream(size_bytes: int):
+    """Yield size_bytes of zeros, reusing one preallocated chunk."""
+    full, rest = divmod(size_bytes, CHUNK_SIZE)
+    for _ in range(full):
+        yield UPLOAD_CHUNK
+    if rest:
+        yield UPLOAD_CHUNK[:rest]
+
+
+async def drain(resp: aiohttp.ClientResponse) -> int:
+    """Read and discard a response body, returning its size in bytes."""
+    total = 0
+    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+        total += len(chunk)
+    return total
+
 
 class NetProbe:
     """Network probe and analytics engine."""
@@ -118,25 +160,42 @@ class NetProbe:
         self.start_time: Optional[datetime] = None
         self.probes_sent = 0
         self.running = False
+        self.probing = asyncio.Event()  # cleared while a speed test saturates the link
+        self.probing.set()
+        self.no_head: set[str] = set()  # endpoints that reject HEAD probes
 
     async def probe_endpoint(self, session: aiohttp.ClientSession,
                             name: str, url: str) -> ProbeResult:
-        """Send a single probe to an endpoint."""
+        """Send a single probe to an endpoint.
+
+        Probes are HEAD requests so no body is transferred; endpoints that
+        answer 405 are remembered and probed with a one-byte ranged GET.
+        """
+        timeout = aiohttp.ClientTimeout(total=5)
         start = time.perf_counter()
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as resp:
-                await resp.read()
-                latency_ms = (time.perf_counter() - start) * 1000
-                return ProbeResult(
-                    endpoint=name,
-                    timestamp=datetime.now(),
-                    latency_ms=latency_ms,
-                    success=True
-                )
+            if name not in self.no_head:
+                async with session.head(url, allow_redirects=True, timeout=timeout) as resp:
+                    if resp.status == 405:
+                        self.no_head.add(name)
+                        start = time.perf_counter()
+
+            if name in self.no_head:
+                async with session.get(url, headers={"Range": "bytes=0-0"},
+                                       timeout=timeout) as resp:
+                    await resp.read()
+
+            latency_ms = (time.perf_counter() - start) * 1000
+            return ProbeResult(
+                endpoint=name,
+                timestamp=time.time_ns(),
+                latency_ms=latency_ms,
+                success=True
+            )
         except Exception as e:
             return ProbeResult(
                 endpoint=name,
-                timestamp=datetime.now(),
+                timestamp=time.time_ns(),
                 latency_ms=0,
                 success=False,
                 error=str(e)[:50]
@@ -149,9 +208,9 @@ class NetProbe:
         start = time.perf_counter()
         try:
             async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as resp:
-                await resp.read()
+                total = await drain(resp)
                 elapsed = time.perf_counter() - start
-                mbps = (size_bytes * 8 / 1_000_000) / elapsed
+                mbps = (total * 8 / 1_000_000) / elapsed
                 return mbps
         except Exception:
             return 0.0
@@ -160,12 +219,11 @@ class NetProbe:
                                    size_bytes: int = 1_048_576) -> float:
         """Measure upload speed in Mbps (simulated with POST)."""
         url = "https://speed.cloudflare.com/__up"
-        data = b'0' * size_bytes
         start = time.perf_counter()
         try:
-            async with session.post(url, data=data,
+            async with session.post(url, data=zero_stream(size_bytes),
                                    timeout=aiohttp.ClientTimeout(total=30)) as resp:
-                await resp.read()
+                await drain(resp)
                 elapsed = time.perf_counter() - start
                 mbps = (size_bytes * 8 / 1_000_000) / elapsed
                 return mbps
@@ -174,34 +232,23 @@ class NetProbe:
 
     def format_quality_indicator(self, quality: ConnectionQuality) -> str:
         """Format quality with color indicator."""
-        indicators = {
-            ConnectionQuality.EXCELLENT: "●",  # Green
-            ConnectionQuality.GOOD: "●",       # Light green
-            ConnectionQuality.FAIR: "●",       # Yellow
-            ConnectionQuality.POOR: "●",       # Orange
-            ConnectionQuality.CRITICAL: "●",   # Red
-        }
-        return f"{indicators[quality]} {quality.value}"
+        return f"{QUALITY_INDICATORS[quality]} {quality.value}"
 
     def format_stats_table(self) -> str:
         """Format statistics as a table."""
-        lines = []
-        lines.append("=" * 90)
-        lines.append(f"{'Endpoint':<15} {'RTT (ms)':<12} {'Min/Max':<15} "
-                    f"{'Jitter':<10} {'Loss %':<8} {'Quality':<12}")
-        lines.append("-" * 90)
+        lines = [TABLE_RULE, TABLE_HEADER, TABLE_DIVIDER]
 
         for name, stats in sorted(self.stats.items()):
             if stats.samples > 0:
-                rtt = f"{stats.avg_latency_ms:.1f}" if stats.latencies else "N/A"
-                minmax = f"{stats.min_latency_ms:.0f}/{stats.max_latency_ms:.0f}" if stats.latencies else "N/A"
-                jitter = f"{stats.jitter_ms:.1f}" if len(stats.latencies) > 1 else "N/A"
+                rtt = f"{stats.avg_latency_ms:.1f}" if stats.n else "N/A"
+                minmax = f"{stats.min_latency_ms:.0f}/{stats.max_latency_ms:.0f}" if stats.n else "N/A"
+                jitter = f"{stats.jitter_ms:.1f}" if stats.n > 1 else "N/A"
                 loss = f"{stats.packet_loss_pct:.1f}%"
                 quality = self.format_quality_indicator(stats.quality)
                 lines.append(f"{name:<15} {rtt:<12} {minmax:<15} "
                            f"{jitter:<10} {loss:<8} {quality:<12}")
 
-        lines.append("=" * 90)
+        lines.append(TABLE_RULE)
         return "\n".join(lines)
 
     def format_speed_results(self, download: float, upload: float) -> str:
@@ -216,30 +263,33 @@ class NetProbe:
         return "\n".join(lines)
 
     async def run_speed_test(self, session: aiohttp.ClientSession):
-        """Run a speed test."""
-        print("\n[*] Running speed test (10MB download)...")
-        download = await self.measure_download_speed(session, 10_485_760)
+        """Run a speed test with the probe loops paused."""
+        self.probing.clear()
+        try:
+            print("\n[*] Running speed test (10MB download)...")
+            download = await self.measure_download_speed(session, 10_485_760)
 
-        print("[*] Running speed test (1MB upload)...")
-        upload = await self.measure_upload_speed(session, 1_048_576)
+            print("[*] Running speed test (1MB upload)...")
+            upload = await self.measure_upload_speed(session, 1_048_576)
+        finally:
+            self.probing.set()
 
         print(self.format_speed_results(download, upload))
         return download, upload
 
-    async def probe_all_endpoints(self, session: aiohttp.ClientSession):
-        """Probe all endpoints concurrently."""
-        tasks = [
-            self.probe_endpoint(session, name, url)
-            for name, url in DERP_ENDPOINTS.items()
-        ]
-        results = await asyncio.gather(*tasks)
-
-        for result in results:
-            if result.endpoint not in self.stats:
-                self.stats[result.endpoint] = EndpointStats(endpoint=result.endpoint)
-            self.stats[result.endpoint].update(result)
-
-        self.probes_sent += len(DERP_ENDPOINTS)
+    async def probe_loop(self, session: aiohttp.ClientSession,
+                         name: str, url: str):
+        """Probe one endpoint on its own cadence, so a slow one can't hold up the rest."""
+        stats = self.stats.setdefault(name, EndpointStats(endpoint=name))
+        while self.running:
+            await self.probing.wait()
+            result = await self.probe_endpoint(session, name, url)
+            # A probe in flight when the speed test started measured its traffic
+            if not self.probing.is_set():
+                continue
+            stats.update(result)
+            self.probes_sent += 1
+            await asyncio.sleep(self.probe_interval)
 
     async def run(self):
         """Main probe loop."""
@@ -258,7 +308,15 @@ class NetProbe:
 ╚══════════════════════════════════════════════════════════════╝
 """)
 
-        connector = aiohttp.TCPConnector(limit=20, ttl_dns_cache=300)
+        # Keep connections (and their TLS sessions) warm between probe rounds
+        connector = aiohttp.TCPConnector(
+            limit=32,
+            limit_per_host=4,
+            ttl_dns_cache=3600,
+            keepalive_timeout=120,
+            enable_cleanup_closed=True,
+            force_close=False,
+        )
         async with aiohttp.ClientSession(connector=connector) as session:
             # Initial speed test
             await self.run_speed_test(session)
@@ -270,26 +328,38 @@ class NetProbe:
             last_speed_test = time.time()
 
             try:
-                while datetime.now() < end_time and self.running:
-                    await self.probe_all_endpoints(session)
-
-                    # Update display
-                    elapsed = datetime.now() - self.start_time
-                    remaining = end_time - datetime.now()
-
-                    print(f"\033[2J\033[H")  # Clear screen
-                    print(f"NetProbe | Elapsed: {str(elapsed).split('.')[0]} | "
-                          f"Remaining: {str(remaining).split('.')[0]} | "
-                          f"Probes: {self.probes_sent:,}")
-                    print()
-                    print(self.format_stats_table())
-
-                    # Periodic speed test
-                    if time.time() - last_speed_test > speed_test_interval:
-                        await self.run_speed_test(session)
-                        last_speed_test = time.time()
-
-                    await asyncio.sleep(self.probe_interval)
+                async with asyncio.TaskGroup() as tg:
+                    probes = [
+                        tg.create_task(self.probe_loop(session, name, url))
+                        for name, url in DERP_ENDPOINTS.items()
+                    ]
+
+                    while self.running:
+                        now = datetime.now()
+                        if now >= end_time:
+                            break
+
+                        # Update display
+                        elapsed = now - self.start_time
+                        remaining = end_time - now
+
+                        print(f"\033[2J\033[H")  # Clear screen
+                        print(f"NetProbe | Elapsed: {str(elapsed).split('.')[0]} | "
+                              f"Remaining: {str(remaining).split('.')[0]} | "
+                              f"Probes: {self.probes_sent:,}")
+                        print()
+                        print(self.format_stats_table())
+
+                        # Periodic speed test
+                        if time.time() - last_speed_test > speed_test_interval:
+                            await self.run_speed_test(session)
+                            last_speed_test = time.time()
+
+                        await asyncio.sleep(self.probe_interval)
+
+                    self.running = False
+                    for probe in probes:
+                        probe.cancel()
 
             except KeyboardInterrupt:
                 self.running = False
@@ -314,7 +384,7 @@ class NetProbe:
 
         # Best endpoint recommendation
         best = min(
-            [(n, s) for n, s in self.stats.items() if s.latencies],
+            [(n, s) for n, s in self.stats.items() if s.n],
             key=lambda x: x[1].avg_latency_ms,
             default=None
         )
@@ -349,4 +419,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    uvloop.run(main())